@@ -1,29 +1,69 @@
 import os
 import asyncio
-import requests
 import json
+import aiohttp
 import discord
 from discord.ext import tasks
 from dotenv import load_dotenv
-from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser
 from supabase import create_client, Client
+from cachetools import TTLCache
+import pybreaker
 import time
 import random
+import re
 from typing import Optional, Dict, Any, Callable
-from functools import wraps
-import threading
+from functools import wraps, lru_cache
+from urllib.parse import urljoin, urlparse
+from contextlib import asynccontextmanager
 import sys
-from collections import deque
-from enum import Enum
+from collections import OrderedDict, defaultdict
 
 # Redis for metadata caching (resolves slow query issues)
 try:
     import redis
+    import redis.asyncio as aioredis
     REDIS_AVAILABLE = True
 except ImportError:
     REDIS_AVAILABLE = False
     print("[WARNING] Redis not available - caching will be in-memory only")
 
+# Aho-Corasick for matching many subscriber keywords in one pass
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+    print("[WARNING] pyahocorasick not available - keyword matching will use substring scans")
+
+# asyncpg for direct Postgres access, used when SUPABASE_DB_URL is configured
+try:
+    import asyncpg
+    ASYNCPG_AVAILABLE = True
+except ImportError:
+    ASYNCPG_AVAILABLE = False
+
+# zstandard for compressing large Redis cache values
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# uvloop as a faster drop-in event loop (not available on Windows)
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = sys.platform != "win32"
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+# orjson for faster JSON decoding/encoding of cached payloads and legacy tag rows
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # All imports are already handled above
 
 load_dotenv()
@@ -32,26 +72,52 @@ DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 CHANNEL_ID = int(os.getenv("CHANNEL_ID"))
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+SUPABASE_DB_URL = os.getenv("SUPABASE_DB_URL")
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+HN_BASE_URL = "https://news.ycombinator.com/"
 HN_URL = "https://news.ycombinator.com/newest"
+HN_API_URL = "https://hacker-news.firebaseio.com/v0"
+HN_STORY_LIST_END = b'class="morelink"'
+MAX_HTML_BYTES = 262144  # 256 KB cap on streamed HTML bodies
+USER_AGENT = "Mozilla/5.0 (compatible; YCNewsBot/1.0; +https://github.com/yc-news-bot)"
+HTTP_HEADERS = {"User-Agent": USER_AGENT}
 
 # Validate required environment variables
 if not DISCORD_TOKEN or not CHANNEL_ID or not SUPABASE_URL or not SUPABASE_KEY:
     exit(1)
 
-# Initialize Redis for metadata caching
+# Async Redis client for metadata caching, connected in on_ready
 redis_client = None
-if REDIS_AVAILABLE:
+
+async def connect_redis():
+    """Connect the async Redis client through a bounded, health-checked connection pool"""
+    global redis_client, REDIS_AVAILABLE
+    if not REDIS_AVAILABLE or redis_client is not None:
+        return
     try:
-        redis_client = redis.from_url(REDIS_URL, decode_responses=True)
-        redis_client.ping()  # Test connection
+        pool = aioredis.BlockingConnectionPool.from_url(
+            REDIS_URL, max_connections=50, timeout=5, health_check_interval=30
+        )
+        redis_conn = aioredis.Redis(connection_pool=pool)
+        await redis_conn.ping()  # Test connection
+        redis_client = redis_conn
         print("[INFO] Redis connected successfully")
     except Exception as e:
         REDIS_AVAILABLE = False
         print(f"[WARNING] Redis connection failed: {e} - using memory cache")
 
-# Initialize Supabase
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+async def close_redis():
+    """Disconnect the Redis connection pool on shutdown"""
+    global redis_client
+    if redis_client is not None:
+        await redis_client.connection_pool.disconnect()
+    redis_client = None
+
+# Supabase client, created on first use and shared by every call site
+@lru_cache(maxsize=1)
+def get_supabase() -> Client:
+    """Return the process-wide Supabase client"""
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
 
 # Initialize Discord client
 intents = discord.Intents.default()
@@ -61,144 +127,259 @@ intents.messages = True
 intents.dm_messages = True
 client = discord.Client(intents=intents)
 
-# Circuit breaker pattern for database queries
-class CircuitState(Enum):
-    CLOSED = "CLOSED"
-    OPEN = "OPEN" 
-    HALF_OPEN = "HALF_OPEN"
-
-class CircuitBreaker:
-    def __init__(self, failure_threshold: int = 5, timeout_ms: int = 60000):
-        self.failure_threshold = failure_threshold
-        self.timeout_ms = timeout_ms
-        self.failure_count = 0
-        self.last_failure_time = None
-        self.state = CircuitState.CLOSED
-        self.lock = threading.Lock()
-    
-    def execute(self, operation: Callable):
-        """Execute operation synchronously (no async here)"""
-        with self.lock:
-            if self.state == CircuitState.OPEN:
-                if self.last_failure_time and (time.time() * 1000 - self.last_failure_time) > self.timeout_ms:
-                    self.state = CircuitState.HALF_OPEN
-                else:
-                    raise Exception("Circuit breaker is OPEN")
-        
+# Shared HTTP session (keeps connection pool, DNS cache and keep-alive across polls)
+http_session: Optional[aiohttp.ClientSession] = None
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Get the shared aiohttp session, creating it on first use"""
+    global http_session
+    if http_session is None or http_session.closed:
+        http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300),
+            headers=HTTP_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=10)
+        )
+    return http_session
+
+async def close_http_session():
+    """Close the shared aiohttp session on shutdown"""
+    global http_session
+    if http_session is not None and not http_session.closed:
+        await http_session.close()
+    http_session = None
+
+class DynamicLimiter:
+    """Concurrency limiter (async context manager) whose capacity can be changed while in use"""
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.active = 0
+        self._condition: Optional[asyncio.Condition] = None
+    
+    def condition(self) -> asyncio.Condition:
+        # Created on first use so it binds to the running loop, not whichever existed at import
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+    
+    async def __aenter__(self):
+        async with self.condition():
+            await self.condition().wait_for(lambda: self.active < self.capacity)
+            self.active += 1
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        async with self.condition():
+            self.active -= 1
+            self.condition().notify()
+    
+    async def set_capacity(self, capacity: int):
+        """Change the capacity; waiters are admitted at once if it grew"""
+        async with self.condition():
+            self.capacity = capacity
+            self.condition().notify_all()
+
+# Per-host concurrency caps so no single origin receives a burst of parallel requests
+HOST_CONCURRENCY = 8
+DEFAULT_RETRY_AFTER = 5
+host_concurrency = HOST_CONCURRENCY  # Current cap, adjustable with !yc-news set-cap
+host_limiters: Dict[str, DynamicLimiter] = defaultdict(lambda: DynamicLimiter(host_concurrency))
+
+def parse_retry_after(value: Optional[str]) -> float:
+    """Parse a Retry-After header given in seconds, falling back to a default delay"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+def rate_limit_delay(retry_after: Optional[str]) -> float:
+    """Wait for a 429: the server's Retry-After plus up to a second of jitter, never exponential"""
+    return round(parse_retry_after(retry_after) + random.uniform(0, 1), 1)
+
+@asynccontextmanager
+async def http_get(url: str, headers: Optional[dict] = None):
+    """GET a URL through the shared session, retrying once after a 429"""
+    async with host_limiters[urlparse(url).netloc]:
+        response = await get_http_session().get(url, headers=headers)
+        if response.status == 429:
+            # Keep holding the host's slot while backing off so its other requests wait too
+            delay = rate_limit_delay(response.headers.get("Retry-After"))
+            response.release()
+            await asyncio.sleep(delay)
+            response = await get_http_session().get(url, headers=headers)
         try:
-            # Execute the operation synchronously
-            result = operation()
-            
-            # Don't await anything - just return the result directly
-            self._on_success()
-            return result
-        except Exception as error:
-            self._on_failure()
-            raise error
-    
-    def _on_success(self):
-        with self.lock:
-            self.failure_count = 0
-            self.state = CircuitState.CLOSED
-    
-    def _on_failure(self):
-        with self.lock:
-            self.failure_count += 1
-            self.last_failure_time = time.time() * 1000
-            if self.failure_count >= self.failure_threshold:
-                self.state = CircuitState.OPEN
+            yield response
+        finally:
+            response.release()
 
+# Validators and parsed result of the last full response per polled URL, for conditional GETs
+conditional_cache: Dict[str, dict] = {}
+
+def conditional_headers(url: str) -> dict:
+    """Build If-None-Match/If-Modified-Since headers from the last response for a URL"""
+    entry = conditional_cache.get(url)
+    if not entry:
+        return {}
+    headers = {}
+    if entry['etag']:
+        headers["If-None-Match"] = entry['etag']
+    if entry['last_modified']:
+        headers["If-Modified-Since"] = entry['last_modified']
+    return headers
+
+def remember_response(url: str, response_headers, result):
+    """Store a URL's validators with its parsed result so a 304 can reuse it"""
+    etag = response_headers.get("ETag")
+    last_modified = response_headers.get("Last-Modified")
+    if etag or last_modified:
+        conditional_cache[url] = {'etag': etag, 'last_modified': last_modified, 'result': result}
+    else:
+        conditional_cache.pop(url, None)
+
+# Rate limiting for database calls and DMs
 class RateLimiter:
+    """Async token bucket allowing max_requests per window_ms"""
     def __init__(self, max_requests: int = 10, window_ms: int = 60000):
-        self.max_requests = max_requests
-        self.window_ms = window_ms
-        self.requests = deque()
-        self.lock = threading.Lock()
+        self.capacity = max_requests
+        self.rate = max_requests / (window_ms / 1000)  # Tokens refilled per second
+        self.tokens = float(max_requests)
+        self.last_refill = time.monotonic()
     
     async def wait_for_slot(self):
-        with self.lock:
-            now = time.time() * 1000
-            while self.requests and now - self.requests[0] >= self.window_ms:
-                self.requests.popleft()
-            
-            if len(self.requests) >= self.max_requests:
-                if self.requests:
-                    oldest_request = self.requests[0]
-                    wait_time = self.window_ms - (now - oldest_request) + 100
-                    await asyncio.sleep(wait_time / 1000)
-                    return await self.wait_for_slot()
-            
-            self.requests.append(now)
+        """Take a slot, sleeping until it has refilled if needed"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate) - 1
+        self.last_refill = now
+        
+        # The slot is reserved before sleeping (no await above), so concurrent callers queue behind it
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
 
 # Initialize circuit breaker and rate limiter for database operations
-circuit_breaker = CircuitBreaker(3, 60000)  # 3 failures triggers 60s timeout
+def create_db_breaker(share_state: bool = False) -> pybreaker.CircuitBreaker:
+    """Create the Supabase circuit breaker, sharing its state through Redis if asked"""
+    state_storage = None
+    if share_state:
+        try:
+            # pybreaker is synchronous, so it gets its own sync client; timeouts keep a dead host from hanging
+            breaker_redis = redis.from_url(REDIS_URL, socket_connect_timeout=2, socket_timeout=2)
+            breaker_redis.ping()
+            state_storage = pybreaker.CircuitRedisStorage(
+                pybreaker.STATE_CLOSED, breaker_redis, namespace="yc-news"
+            )
+        except Exception as e:
+            print(f"[WARNING] Redis circuit state unavailable: {e} - using in-process state")
+    return pybreaker.CircuitBreaker(fail_max=3, reset_timeout=60, state_storage=state_storage, name="supabase")
+
+db_breaker = create_db_breaker()  # 3 failures triggers 60s timeout; in-process until on_ready
+
+breaker_state_shared = False
+
+async def share_db_breaker_state():
+    """Move the breaker's state into Redis once the async client has connected"""
+    global db_breaker, breaker_state_shared
+    # on_ready fires again after reconnects; only swap the breaker once
+    if redis_client is not None and not breaker_state_shared:
+        breaker_state_shared = True
+        # Built in a thread since the sync client's ping blocks
+        db_breaker = await asyncio.to_thread(create_db_breaker, True)
+
 rate_limiter = RateLimiter(5, 30000)  # 5 requests per 30 seconds
 
+# Direct Postgres pool; when open, hot-path reads and batched writes bypass PostgREST
+db_pool = None
+
+# Upsert statement and column order per table for the asyncpg write path
+UPSERT_SQL = {
+    'subscriptions': (
+        'INSERT INTO subscriptions ("userId", subscribed, tags) VALUES ($1, $2, $3) '
+        'ON CONFLICT ("userId") DO UPDATE SET subscribed = EXCLUDED.subscribed, tags = EXCLUDED.tags',
+        ('userId', 'subscribed', 'tags')
+    ),
+    'posted_stories': (
+        'INSERT INTO posted_stories (id) VALUES ($1) ON CONFLICT (id) DO NOTHING',
+        ('id',)
+    )
+}
+
+async def open_db_pool():
+    """Open the asyncpg pool if a database URL is configured"""
+    global db_pool
+    if db_pool is not None or not (ASYNCPG_AVAILABLE and SUPABASE_DB_URL):
+        return
+    try:
+        # Supabase's transaction pooler can't keep prepared statements across connections
+        pool = await asyncpg.create_pool(SUPABASE_DB_URL, min_size=1, max_size=4, statement_cache_size=0)
+        # UPSERT_SQL sends tags as a list, which only binds to text[]; legacy JSON-text columns stay on REST
+        tags_type = await pool.fetchval(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_schema = 'public' AND table_name = 'subscriptions' AND column_name = 'tags'"
+        )
+        if tags_type != 'ARRAY':
+            await pool.close()
+            print(f"[WARNING] subscriptions.tags is {tags_type}, not text[] - using Supabase REST (see README migration)")
+            return
+        db_pool = pool
+        print("[INFO] Connected to Postgres via asyncpg")
+    except Exception as e:
+        print(f"[WARNING] asyncpg pool failed: {e} - using Supabase REST")
+
+async def close_db_pool():
+    """Close the asyncpg pool on shutdown"""
+    global db_pool
+    if db_pool is not None:
+        await db_pool.close()
+    db_pool = None
+
+# The bot runs on a single event loop thread, so shared state needs no threading locks;
+# blocking I/O goes to a worker thread via asyncio.to_thread rather than behind a lock
+async def run_db(operation: Callable):
+    """Run a blocking Supabase call through the circuit breaker in a worker thread"""
+    return await asyncio.to_thread(db_breaker.call, operation)
+
 # Rate limiting and retry constants
 BASE_RETRY_DELAY = 2
 MAX_RETRY_DELAY = 300
 MAX_RETRIES = 5
-API_RATE_LIMIT = 45
+FETCH_RETRIES = 3
 DM_RATE_LIMIT = 5
+DELIVERY_CONCURRENCY = 8  # Users served in parallel per news cycle
+DELIVERY_TIMEOUT = 300  # Seconds a news cycle may spend sending DMs
+delivery_limiter = DynamicLimiter(DELIVERY_CONCURRENCY)
+NEWS_INTERVAL_HOURS = 6
+FETCH_FAILURE_RETRY_MINUTES = 15
 
-def exponential_backoff(attempt: int) -> int:
+def exponential_backoff(attempt: int) -> float:
     """Calculate exponential backoff delay with jitter"""
     delay = min(BASE_RETRY_DELAY * (2 ** attempt), MAX_RETRY_DELAY)
-    # Add jitter to avoid thundering herd
-    jitter = random.uniform(0.1, 0.5) * delay
-    return int(delay + jitter)
+    # Equal jitter: spread retries over [delay/2, delay] so instances don't retry in lockstep
+    return round(delay / 2 + random.uniform(0, delay / 2), 1)
 
-async def rate_limit_check(operation_type: str = "api") -> bool:
-    """Check if we're within rate limits"""
-    global last_api_request, dm_cooldowns
-    
-    current_time = time.time()
-    
-    if operation_type == "api":
-        # API rate limiting (45 requests per minute)
-        last_minute_requests = [t for t in last_api_request.get("api", []) if current_time - t < 60]
-        if len(last_minute_requests) >= API_RATE_LIMIT:
-            return False
-        
-        if "api" not in last_api_request:
-            last_api_request["api"] = []
-        last_api_request["api"].append(current_time)
-        
-        # Keep only recent timestamps
-        last_api_request["api"] = [t for t in last_api_request["api"] if current_time - t < 60]
-        
-    elif operation_type == "dm":
-        # DM rate limiting per user
-        if len(dm_cooldowns) >= DM_RATE_LIMIT:
-            return False
-    
-    return True
+dm_rate_limiter = RateLimiter(DM_RATE_LIMIT, 1000)  # 5 DMs per second
 
-async def wait_for_rate_limit(operation_type: str = "api"):
-    """Wait until we're within rate limits"""
-    while not await rate_limit_check(operation_type):
-        if operation_type == "api":
-            await asyncio.sleep(1.5)  # Wait for API rate limit reset
-        else:
-            await asyncio.sleep(0.6)  # Wait for DM rate limit reset
+# Track posted story IDs to avoid duplicates (bounded LRU, persisted in Supabase)
+POSTED_IDS_LIMIT = 5000
+posted_ids: "OrderedDict[str, None]" = OrderedDict()
 
-# Track posted story IDs to avoid duplicates
-posted_ids = set()
+def remember_posted_id(story_id: str):
+    """Record a posted story ID, evicting the oldest once over POSTED_IDS_LIMIT"""
+    posted_ids[story_id] = None
+    posted_ids.move_to_end(story_id)
+    if len(posted_ids) > POSTED_IDS_LIMIT:
+        posted_ids.popitem(last=False)
 
 # Rate limiting trackers
-last_api_request = {}
 dm_cooldowns = {}
 connection_attempts = 0
 last_connection_attempt = 0
 
 # Enhanced caching system for metadata (resolves slow query issues)
-cache_lock = threading.Lock()
+# Cache calls all run on the event loop thread, so plain counters need no lock
 cache_hits = 0
 cache_misses = 0
 
-# User subscription cache (existing functionality)
-user_cache = {}
-cache_expiry = {}
+# In-memory cache tier: one TTLCache per cache type so entries expire on their own TTL
+memory_caches: Dict[str, TTLCache] = {}
+MEMORY_CACHE_SIZE = 10000  # Entries per cache type
 CACHE_TTL = 300  # 5 minutes
 
 # Metadata cache for database performance (new - resolves slow queries)
@@ -206,45 +387,181 @@ METADATA_CACHE_TTL = {
     'timezone_names': 86400,      # 24 hours - timezone names rarely change
     'extension_info': 43200,        # 12 hours - extensions change infrequently  
     'function_metadata': 43200,     # 12 hours - functions change rarely
-    'user_subscriptions': 300          # 5 minutes - user data changes frequently
+    'hn_items': 3600,               # 1 hour - story titles/URLs are rarely edited
+    'dm_channels': 2592000          # 30 days - a user's DM channel ID doesn't change
 }
 
-def fetch_hn_stories():
-    """Fetch latest stories from Hacker News"""
-    try:
-        response = requests.get(HN_URL, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
+def memory_cache(cache_type: str) -> TTLCache:
+    """Return the in-memory cache for a cache type, creating it on first use"""
+    cache = memory_caches.get(cache_type)
+    if cache is None:
+        ttl = METADATA_CACHE_TTL.get(cache_type, CACHE_TTL)
+        cache = memory_caches[cache_type] = TTLCache(maxsize=MEMORY_CACHE_SIZE, ttl=ttl)
+    return cache
+
+def parse_hn_stories(html: str) -> list:
+    """Parse the latest stories out of the HN /newest page"""
+    tree = LexborHTMLParser(html)
+    
+    stories = []
+    story_rows = 0
+    current_story = None  # Story still waiting for its subtext row
+    
+    # One document-order pass pairs each story row with the subtext cell after it
+    for node in tree.css("tr.athing, td.subtext"):
+        if node.tag == "td":
+            if current_story is not None:
+                age_node = node.css_first("span.age")
+                if age_node:
+                    current_story["age"] = age_node.text()
+                current_story = None
+            continue
+        
+        story_rows += 1
+        if story_rows > 20:  # Get latest 20 stories
+            break
         
-        stories = []
-        story_rows = soup.select("tr.athing")[:20]  # Get latest 20 stories
+        current_story = None
+        story_id = node.attributes.get("id")
+        title_link = node.css_first("span.titleline a")
         
-        for row in story_rows:
-            story_id = row.get("id")
-            title_link = row.select_one("span.titleline a")
-            
-            if not title_link:
-                continue
-                
-            title = title_link.text.strip()
-            url = title_link.get("href", "")
-            hn_link = f"https://news.ycombinator.com/item?id={story_id}"
-            
-            # Get story age
-            subtext = row.find_next_sibling("tr").select_one("td.subtext")
-            age = subtext.select_one("span.age").text if subtext else "unknown"
+        if not title_link:
+            continue
             
-            stories.append({
-                "id": story_id,
-                "title": title,
-                "url": url,
-                "hn_link": hn_link,
-                "age": age
-            })
-            
-        return stories
-    except Exception:
-        return []
+        title = title_link.text().strip()
+        url = title_link.attributes.get("href") or ""
+        hn_link = f"{HN_BASE_URL}item?id={story_id}"
+        
+        current_story = {
+            "id": story_id,
+            "title": title,
+            "url": url,
+            "hn_link": hn_link,
+            # Resolve relative HN links (Ask HN etc.) once, not per DM
+            "source_link": urljoin(HN_BASE_URL, url),
+            "age": "unknown"
+        }
+        stories.append(current_story)
+        
+    return stories
+
+async def read_html_prefix(response: aiohttp.ClientResponse, stop_marker: bytes, max_bytes: int = MAX_HTML_BYTES) -> str:
+    """Stream a response body, stopping once stop_marker is seen or max_bytes is read"""
+    # Don't stream a captive portal's binary payload or a JSON error into the HTML parser
+    if response.content_type != "text/html":
+        raise ValueError(f"expected text/html, got {response.content_type}")
+    
+    buf = bytearray()
+    async for chunk in response.content.iter_chunked(16384):
+        # Only rescan the tail so the marker check stays linear in body size
+        search_from = max(0, len(buf) - len(stop_marker))
+        buf += chunk
+        if buf.find(stop_marker, search_from) != -1 or len(buf) >= max_bytes:
+            break
+    return buf.decode(response.charset or "utf-8", errors="replace")
+
+def format_story_age(posted_at: int) -> str:
+    """Render a Unix timestamp the way HN shows story ages ("5 minutes ago")"""
+    seconds = max(0, int(time.time()) - int(posted_at))
+    for unit, size in (("day", 86400), ("hour", 3600), ("minute", 60)):
+        if seconds >= size:
+            count = seconds // size
+            return f"{count} {unit}{'s' if count != 1 else ''} ago"
+    return "just now"
+
+async def fetch_hn_item(item_id: str) -> Optional[dict]:
+    """Fetch a single item from the HN Firebase API"""
+    async with http_get(f"{HN_API_URL}/item/{item_id}.json") as response:
+        response.raise_for_status()
+        return await response.json()
+
+async def fetch_hn_items(item_ids: list) -> list:
+    """Fetch HN items in order, reading and writing the cache in one round-trip each"""
+    cache_keys = [f"hn_item:{item_id}" for item_id in item_ids]
+    cached = await get_cached_data_bulk(cache_keys, 'hn_items')
+    
+    missing = [item_id for item_id, cache_key in zip(item_ids, cache_keys) if cache_key not in cached]
+    fetched = await asyncio.gather(
+        *(fetch_hn_item(item_id) for item_id in missing),
+        return_exceptions=True
+    )
+    
+    fresh = {}
+    for item_id, item in zip(missing, fetched):
+        if item and not isinstance(item, BaseException):
+            fresh[f"hn_item:{item_id}"] = item
+    if fresh:
+        await set_cached_data_bulk(fresh, 'hn_items')
+    
+    # Failed fetches come back as None and are skipped by the caller
+    return [cached.get(cache_key) or fresh.get(cache_key) for cache_key in cache_keys]
+
+async def fetch_hn_stories_api(exclude_ids=None) -> list:
+    """Fetch latest stories from the official HN Firebase API"""
+    url = f"{HN_API_URL}/newstories.json"
+    async with http_get(url, headers=conditional_headers(url)) as response:
+        response.raise_for_status()
+        if response.status == 304:
+            story_ids = conditional_cache[url]['result']
+        else:
+            story_ids = await response.json()
+            remember_response(url, response.headers, story_ids)
+    
+    # Skip already-posted IDs before spending a request on their items
+    exclude_ids = exclude_ids if exclude_ids is not None else ()
+    new_ids = [str(story_id) for story_id in story_ids[:20] if str(story_id) not in exclude_ids]
+    
+    items = await fetch_hn_items(new_ids)
+    
+    stories = []
+    for item in items:
+        if not item:
+            continue
+        if item.get("deleted") or item.get("dead") or not item.get("title"):
+            continue
+        
+        story_id = str(item["id"])
+        # Text posts have no URL; mirror the relative link the HN page uses
+        url = item.get("url") or f"item?id={story_id}"
+        stories.append({
+            "id": story_id,
+            "title": item["title"],
+            "url": url,
+            "hn_link": f"{HN_BASE_URL}item?id={story_id}",
+            "source_link": urljoin(HN_BASE_URL, url),
+            "age": format_story_age(item.get("time", time.time()))
+        })
+    
+    return stories
+
+async def fetch_hn_stories(exclude_ids=None):
+    """Fetch latest stories from Hacker News with retries; returns None if every attempt fails"""
+    for attempt in range(FETCH_RETRIES):
+        if attempt:
+            await asyncio.sleep(exponential_backoff(attempt - 1))
+        
+        try:
+            return await fetch_hn_stories_api(exclude_ids)
+        except Exception as e:
+            print(f"[WARNING] HN API fetch failed: {e} - falling back to HTML scrape")
+        
+        try:
+            async with http_get(HN_URL, headers=conditional_headers(HN_URL)) as response:
+                response.raise_for_status()
+                if response.status == 304:
+                    # Page unchanged since the last poll; skip the download and parse
+                    return conditional_cache[HN_URL]['result']
+                # Story rows end at the "More" link; skip downloading the footer
+                html = await read_html_prefix(response, HN_STORY_LIST_END)
+                response_headers = response.headers
+            # Lexbor parses the truncated page in milliseconds; a thread keeps it off the event loop
+            stories = await asyncio.to_thread(parse_hn_stories, html)
+            remember_response(HN_URL, response_headers, stories)
+            return stories
+        except Exception as e:
+            print(f"[WARNING] HN scrape failed (attempt {attempt + 1}/{FETCH_RETRIES}): {e}")
+    
+    return None
 
 async def debug_hn_scraping():
     """Comprehensive debug function to analyze HN scraping issues"""
@@ -259,10 +576,12 @@ async def debug_hn_scraping():
         # Step 1: Network connectivity
         debug_info["steps"]["network"] = "testing"
         try:
-            response = requests.get(HN_URL, timeout=10)
-            response.raise_for_status()
-            debug_info["steps"]["network"] = f"success ({len(response.content)} bytes received)"
-            debug_info["steps"]["status_code"] = response.status_code
+            async with http_get(HN_URL) as response:
+                response.raise_for_status()
+                content = await response.read()
+                html = content.decode(response.get_encoding(), errors="replace")
+            debug_info["steps"]["network"] = f"success ({len(content)} bytes received)"
+            debug_info["steps"]["status_code"] = response.status
         except Exception as e:
             debug_info["steps"]["network"] = f"failed: {str(e)}"
             debug_info["errors"].append(f"Network error: {str(e)}")
@@ -271,7 +590,7 @@ async def debug_hn_scraping():
         # Step 2: HTML parsing
         debug_info["steps"]["parsing"] = "testing"
         try:
-            soup = BeautifulSoup(response.text, "html.parser")
+            tree = LexborHTMLParser(html)
             debug_info["steps"]["parsing"] = "success"
         except Exception as e:
             debug_info["steps"]["parsing"] = f"failed: {str(e)}"
@@ -282,11 +601,11 @@ async def debug_hn_scraping():
         debug_info["steps"]["selectors"] = {}
         
         # Test main story selector
-        story_rows = soup.select("tr.athing")
+        story_rows = tree.css("tr.athing")
         debug_info["steps"]["selectors"]["tr.athing"] = f"found {len(story_rows)} rows"
         
         # Test alternative selectors
-        alt_story_rows = soup.select("tr.athing.submission")
+        alt_story_rows = tree.css("tr.athing.submission")
         debug_info["steps"]["selectors"]["tr.athing.submission"] = f"found {len(alt_story_rows)} rows"
         
         # Step 4: Detailed parsing analysis
@@ -313,15 +632,17 @@ async def debug_hn_scraping():
             }
             
             # Get story ID
-            story_id = row.get("id")
+            story_id = row.attributes.get("id")
             story_debug["steps"]["id"] = story_id if story_id else "MISSING"
             
             # Test title link selector
-            title_link = row.select_one("span.titleline a")
+            title_link = row.css_first("span.titleline a")
             if title_link:
                 story_debug["steps"]["title_link"] = "found"
-                story_debug["title"] = title_link.text.strip()[:50] + "..." if len(title_link.text.strip()) > 50 else title_link.text.strip()
-                story_debug["url"] = title_link.get("href", "")[:50] + "..." if len(title_link.get("href", "")) > 50 else title_link.get("href", "")
+                title = title_link.text().strip()
+                href = title_link.attributes.get("href") or ""
+                story_debug["title"] = title[:50] + "..." if len(title) > 50 else title
+                story_debug["url"] = href[:50] + "..." if len(href) > 50 else href
             else:
                 story_debug["steps"]["title_link"] = "MISSING"
                 failure_reasons["title_link_missing"] = failure_reasons.get("title_link_missing", 0) + 1
@@ -330,11 +651,14 @@ async def debug_hn_scraping():
                 continue
             
             # Test subtext/age extraction
-            subtext = row.find_next_sibling("tr").select_one("td.subtext")
+            subtext_row = row.next
+            while subtext_row is not None and subtext_row.tag != "tr":
+                subtext_row = subtext_row.next
+            subtext = subtext_row.css_first("td.subtext") if subtext_row else None
             if subtext:
-                age_element = subtext.select_one("span.age")
+                age_element = subtext.css_first("span.age")
                 if age_element:
-                    story_debug["steps"]["age"] = age_element.text
+                    story_debug["steps"]["age"] = age_element.text()
                 else:
                     story_debug["steps"]["age"] = "MISSING"
                     failure_reasons["age_missing"] = failure_reasons.get("age_missing", 0) + 1
@@ -354,9 +678,9 @@ async def debug_hn_scraping():
             "failure_reasons": failure_reasons
         }
         
-        # Step 6: Final story count
-        final_stories = fetch_hn_stories()
-        debug_info["steps"]["final_result"] = f"fetch_hn_stories() returned {len(final_stories)} stories"
+        # Step 6: Final story count, parsed from the page already downloaded above
+        final_stories = await asyncio.to_thread(parse_hn_stories, html)
+        debug_info["steps"]["final_result"] = f"parse_hn_stories() returned {len(final_stories)} stories"
         
         debug_info["status"] = "completed"
         return debug_info
@@ -366,20 +690,74 @@ async def debug_hn_scraping():
         debug_info["errors"].append(f"General error: {str(e)}")
         return debug_info
 
-def story_matches_keywords(story: dict, keywords: list) -> bool:
-    """Check if story title or URL contains any keywords"""
-    if not keywords:
-        return True
-    
-    title_lower = story["title"].lower()
-    url_lower = story["url"].lower()
-    
-    for keyword in keywords:
-        keyword_lower = keyword.lower().strip()
-        if keyword_lower and (keyword_lower in title_lower or keyword_lower in url_lower):
-            return True
+def normalize_tags(tags: list) -> list:
+    """Lowercase and strip tags once so matching never has to"""
+    return [tag.lower().strip() for tag in tags if tag.strip()]
+
+def build_keyword_index(subscriptions: dict) -> Dict[str, set]:
+    """Build an inverted index of lowercased keyword -> subscribed user IDs"""
+    keyword_index = defaultdict(set)
+    for user_id, user_data in subscriptions.items():
+        if not user_data.get('subscribed'):
+            continue
+        tags_norm = user_data.get('tags_norm')
+        if tags_norm is None:
+            tags_norm = normalize_tags(user_data.get('tags', []))
+        for keyword_lower in tags_norm:
+            keyword_index[keyword_lower].add(user_id)
+    return keyword_index
+
+class KeywordMatcher:
+    """Matches stories against every subscriber's keywords at once"""
+    def __init__(self, subscriptions: dict):
+        self.keyword_index = build_keyword_index(subscriptions)
+        self.automaton = None
+        self.pattern = None
+        
+        # One Aho-Corasick automaton over all distinct keywords when available
+        if AHOCORASICK_AVAILABLE and self.keyword_index:
+            self.automaton = ahocorasick.Automaton()
+            for keyword_lower in self.keyword_index:
+                self.automaton.add_word(keyword_lower, keyword_lower)
+            self.automaton.make_automaton()
+        elif self.keyword_index:
+            # Otherwise one compiled alternation lets re's C engine reject non-matching stories
+            self.pattern = re.compile("|".join(map(re.escape, self.keyword_index)))
     
-    return False
+    def users_for(self, story: dict) -> set:
+        """Return the users with any keyword contained in the story title or URL"""
+        title_lower = story["title"].lower()
+        url_lower = story["url"].lower()
+        
+        if self.automaton is not None:
+            # Single pass over the text yields every matching keyword
+            hits = {keyword for _, keyword in self.automaton.iter(f"{title_lower}\n{url_lower}")}
+        elif self.pattern is None or not (self.pattern.search(title_lower) or self.pattern.search(url_lower)):
+            return set()
+        else:
+            # Each distinct keyword is checked once, however many users share it
+            hits = [
+                keyword_lower for keyword_lower in self.keyword_index
+                if keyword_lower in title_lower or keyword_lower in url_lower
+            ]
+        
+        matched_users = set()
+        for keyword_lower in hits:
+            matched_users |= self.keyword_index[keyword_lower]
+        return matched_users
+
+# In-flight loads by key, so concurrent callers on a cache miss share one fetch
+inflight_loads: Dict[str, asyncio.Future] = {}
+
+async def single_flight(key: str, load: Callable):
+    """Run load() once per key at a time; concurrent callers await the same result"""
+    task = inflight_loads.get(key)
+    if task is None:
+        task = asyncio.ensure_future(load())
+        inflight_loads[key] = task
+        task.add_done_callback(lambda _: inflight_loads.pop(key, None))
+    # Shield so one caller being cancelled doesn't cancel the load for the others
+    return await asyncio.shield(task)
 
 # Cache decorator for database operations
 def cached_query(ttl: int = 3600, cache_type: str = 'default'):
@@ -387,172 +765,155 @@ def cached_query(ttl: int = 3600, cache_type: str = 'default'):
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            cache_key = f"{func.__name__}_{hash(str(args) + str(kwargs))}"
+            # repr of the argument tuple is stable across processes, unlike hash() of a str
+            cache_key = f"{func.__name__}:{(args, tuple(sorted(kwargs.items())))!r}"
             
             try:
                 # Check cache first
-                cached = get_cached_data(cache_key, cache_type)
+                cached = await get_cached_data(cache_key, cache_type)
                 if cached is not None:
                     return cached
                 
-                # Execute with circuit breaker protection
-                await rate_limiter.wait_for_slot()
-                
-                # Execute the async function and get the actual result
-                # We need to handle the async function properly
-                if asyncio.iscoroutinefunction(func):
-                    result = await func(*args, **kwargs)
-                else:
-                    result = func(*args, **kwargs)
-                
-                # Cache the result (only if it's JSON serializable)
-                try:
-                    set_cached_data(cache_key, result, cache_type)
-                except (TypeError, ValueError) as e:
-                    print(f"[WARNING] Failed to cache result for {cache_key}: {e}")
+                async def load():
+                    # Execute with circuit breaker protection
+                    await rate_limiter.wait_for_slot()
+                    
+                    # Execute the async function and get the actual result
+                    # We need to handle the async function properly
+                    if asyncio.iscoroutinefunction(func):
+                        result = await func(*args, **kwargs)
+                    else:
+                        result = func(*args, **kwargs)
+                    
+                    # Cache the result (only if it's JSON serializable)
+                    try:
+                        await set_cached_data(cache_key, result, cache_type)
+                    except (TypeError, ValueError) as e:
+                        print(f"[WARNING] Failed to cache result for {cache_key}: {e}")
+                    
+                    return result
                 
-                return result
+                # Concurrent misses for the same key share one query
+                return await single_flight(cache_key, load)
                 
             except Exception as error:
                 # Try to serve stale data if available
                 if REDIS_AVAILABLE and redis_client:
-                    stale = redis_client.get(f"{cache_key}:stale")
+                    stale = await redis_client.get(f"{cache_key}:stale")
                     if stale:
                         print(f"[WARNING] Serving stale data for {cache_key}")
-                        return json.loads(stale)
+                        return decode_cache_value(stale)
                 raise error
         
         return wrapper
     return decorator
 
-async def load_subscriptions():
-    """Load user subscriptions from Supabase with caching"""
-    cache_key = "load_subscriptions_all"
+# In-process copy of the subscriptions table (userId -> subscription), loaded once and written through
+subscriptions_cache: Dict[str, dict] = {}
+subscriptions_loaded = False
+
+def make_subscription(subscribed: bool, tags: list) -> dict:
+    """Build a subscription entry with its normalized tags precomputed"""
+    return {'subscribed': subscribed, 'tags': tags, 'tags_norm': normalize_tags(tags)}
+
+async def load_subscriptions(refresh: bool = False):
+    """Return user subscriptions, reading the Supabase table only on first use or refresh"""
+    if subscriptions_loaded and not refresh:
+        return subscriptions_cache
+    
+    # Commands arriving while the table is being read share that one read
+    return await single_flight('load_subscriptions', read_subscriptions)
+
+async def read_subscriptions():
+    """Read the subscriptions table into the in-process cache"""
+    global subscriptions_loaded
     
     try:
-        # Check cache first
-        cached = get_cached_data(cache_key, 'user_subscriptions')
-        if cached is not None:
-            return cached
-        
-        await rate_limiter.wait_for_slot()
-        
-        response = circuit_breaker.execute(
-            lambda: supabase.table('subscriptions').select('*').execute()
-        )
-        
-        # Check if response is None or data is None (can happen with RLS issues)
-        if not response or response.data is None:
-            print("[WARNING] No data returned - Check RLS policies or table access")
-            return {}
-        
-        if not response.data:
-            return {}
+        if db_pool is not None:
+            rows = await db_pool.fetch('SELECT "userId", subscribed, tags FROM subscriptions')
+        else:
+            await rate_limiter.wait_for_slot()
+            
+            response = await run_db(
+                lambda: get_supabase().table('subscriptions').select('*').execute()
+            )
+            
+            # Check if response is None or data is None (can happen with RLS issues)
+            if not response or response.data is None:
+                print("[WARNING] No data returned - Check RLS policies or table access")
+                return subscriptions_cache
+            rows = response.data
         
         subscriptions = {}
-        for row in response.data:
-            subscriptions[row['userId']] = {
-                'subscribed': bool(row['subscribed']),
-                'tags': json.loads(row['tags']) if row['tags'] else []
-            }
-        
-        # Cache the result
-        set_cached_data(cache_key, subscriptions, 'user_subscriptions')
-        return subscriptions
+        for row in rows:
+            tags = row['tags'] or []
+            if isinstance(tags, str):
+                # Row not yet migrated to text[] (legacy JSON-encoded tags)
+                tags = json_loads(tags)
+            subscriptions[row['userId']] = make_subscription(bool(row['subscribed']), tags)
+        
+        # Writes still queued or mid-flush are newer than what the table returned (queued last, as newest)
+        for buffer in (inflight_upserts, pending_upserts):
+            for user_id, row in buffer.get('subscriptions', {}).items():
+                subscriptions[user_id] = make_subscription(row['subscribed'], row['tags'])
+        
+        # Swap contents in place so callers holding the dict see the refresh
+        subscriptions_cache.clear()
+        subscriptions_cache.update(subscriptions)
+        subscriptions_loaded = True
+        return subscriptions_cache
         
     except Exception as e:
         error_str = str(e)
         if "no RLS policies" in error_str or "no data will be returned" in error_str:
             print("[ERROR] RLS policies issue detected - table access blocked")
-        return {}
+        return subscriptions_cache
+
+async def load_subscriptions_for_command():
+    """Load subscriptions for a command, raising if the table couldn't be read (each call retries)"""
+    subscriptions = await load_subscriptions()
+    # Acting on an empty cache from a failed read would overwrite the user's stored row
+    if not subscriptions_loaded:
+        raise RuntimeError("subscriptions are temporarily unavailable, please try again shortly")
+    return subscriptions
+
+def save_subscription(user_id: str, subscribed: bool, tags: list):
+    """Update the in-process subscription and queue its Supabase write"""
+    subscriptions_cache[user_id] = make_subscription(subscribed, tags)
+    queue_upsert('subscriptions', user_id, {
+        'userId': user_id,
+        'subscribed': subscribed,
+        'tags': tags
+    })
 
 async def subscribe_user(user_id: str):
-    """Subscribe user to news updates with enhanced caching"""
+    """Subscribe user to news updates"""
     try:
-        # Check cache first
-        cached_data = get_cached_user_data(user_id)
-        if cached_data:
-            subscriptions = {user_id: cached_data}
-        else:
-            subscriptions = await load_subscriptions()
-        
-        # Prepare subscription data
-        if user_id not in subscriptions:
-            subscription_data = {'subscribed': True, 'tags': []}
-        else:
-            subscription_data = subscriptions[user_id].copy()
-            subscription_data['subscribed'] = True
-        
-        # Insert/upsert subscription with circuit breaker protection
-        await rate_limiter.wait_for_slot()
-        circuit_breaker.execute(
-            lambda: supabase.table('subscriptions').upsert({
-                'userId': user_id,
-                'subscribed': subscriptions[user_id]['subscribed'],
-                'tags': json.dumps(subscriptions[user_id]['tags'])
-            }).execute()
-        )
+        subscriptions = await load_subscriptions_for_command()
+        current = subscriptions.get(user_id)
         
-        # Update cache since upsert succeeded
-        set_cached_user_data(user_id, subscription_data)
+        save_subscription(user_id, True, list(current['tags']) if current else [])
         return True, "Successfully subscribed to YC News updates"
             
     except Exception as e:
-        error_str = str(e)
-        if "row-level security" in error_str or "no RLS policies" in error_str:
-            return False, "Database permission error. You need to either: 1) Add RLS policies, or 2) Disable RLS completely in Supabase."
-        elif "duplicate key" in error_str:
-            return True, "Already subscribed to YC News updates"
-        else:
-            return False, f"Error processing subscription: {error_str}"
+        return False, f"Error processing subscription: {str(e)}"
 
 async def unsubscribe_user(user_id: str):
-    """Unsubscribe user from news updates with enhanced caching"""
+    """Unsubscribe user from news updates"""
     try:
-        # Check cache first
-        cached_data = get_cached_user_data(user_id)
-        if cached_data:
-            subscriptions = {user_id: cached_data}
-        else:
-            subscriptions = await load_subscriptions()
-        
-        if user_id in subscriptions:
-            subscriptions[user_id]['subscribed'] = False
+        subscriptions = await load_subscriptions_for_command()
+        current = subscriptions.get(user_id)
         
-        await rate_limiter.wait_for_slot()
-        result = circuit_breaker.execute(
-            lambda: supabase.table('subscriptions').upsert({
-                'userId': user_id,
-                'subscribed': False,
-                'tags': json.dumps(subscriptions[user_id]['tags'] if user_id in subscriptions else [])
-            }).execute()
-        )
-        
-        if result and result.data:
-            # Update cache
-            if user_id in subscriptions:
-                subscriptions[user_id]['subscribed'] = False
-                set_cached_user_data(user_id, subscriptions[user_id])
-            return True, "Successfully unsubscribed from YC News updates"
-        else:
-            return False, "Failed to update subscription record"
+        save_subscription(user_id, False, list(current['tags']) if current else [])
+        return True, "Successfully unsubscribed from YC News updates"
             
     except Exception as e:
-        error_str = str(e)
-        if "row-level security" in error_str:
-            return False, "Database permission error. Please check RLS policies in Supabase."
-        else:
-            return False, f"Error processing unsubscription: {error_str}"
+        return False, f"Error processing unsubscription: {str(e)}"
 
 async def get_user_tags(user_id: str):
-    """Get user's current tags with enhanced caching"""
+    """Get user's current tags"""
     try:
-        # Check cache first
-        cached_data = get_cached_user_data(user_id)
-        if cached_data:
-            subscriptions = {user_id: cached_data}
-        else:
-            subscriptions = await load_subscriptions()
+        subscriptions = await load_subscriptions_for_command()
         
         if user_id not in subscriptions:
             return True, "User is not subscribed", []
@@ -566,39 +927,26 @@ async def get_user_tags(user_id: str):
         return False, f"Error retrieving tags: {str(e)}", []
 
 async def add_user_tags(user_id: str, tags: list):
-    """Add tags to user's subscription with enhanced caching"""
+    """Add tags to user's subscription"""
     try:
-        # Check cache first
-        cached_data = get_cached_user_data(user_id)
-        if cached_data:
-            subscriptions = {user_id: cached_data}
-        else:
-            subscriptions = await load_subscriptions()
+        subscriptions = await load_subscriptions_for_command()
+        current = subscriptions.get(user_id)
         
-        if user_id not in subscriptions:
-            subscriptions[user_id] = {'subscribed': True, 'tags': []}
-        
-        if 'tags' not in subscriptions[user_id]:
-            subscriptions[user_id]['tags'] = []
+        subscribed = current['subscribed'] if current else True
+        user_tags = list(current['tags']) if current else []
             
+        # Set membership keeps this linear in the number of tags
+        existing = set(user_tags)
         added_tags = []
         for tag in tags:
             tag_clean = tag.strip()
-            if tag_clean and tag_clean not in subscriptions[user_id]['tags']:
-                subscriptions[user_id]['tags'].append(tag_clean)
+            if tag_clean and tag_clean not in existing:
+                existing.add(tag_clean)
                 added_tags.append(tag_clean)
+        user_tags.extend(added_tags)
         
-        await rate_limiter.wait_for_slot()
-        circuit_breaker.execute(
-            lambda: supabase.table('subscriptions').upsert({
-                'userId': user_id,
-                'subscribed': subscriptions[user_id]['subscribed'],
-                'tags': json.dumps(subscriptions[user_id]['tags'])
-            }).execute()
-        )
-        
-        # Update cache
-        set_cached_user_data(user_id, subscriptions[user_id])
+        if added_tags or not current:
+            save_subscription(user_id, subscribed, user_tags)
         
         if added_tags:
             return True, f"Successfully added tags: {', '.join(added_tags)}", added_tags
@@ -608,39 +956,23 @@ async def add_user_tags(user_id: str, tags: list):
         return False, f"Error adding tags: {str(e)}", []
 
 async def remove_user_tags(user_id: str, tags: list):
-    """Remove tags from user's subscription with enhanced caching"""
+    """Remove tags from user's subscription"""
     try:
-        # Check cache first
-        cached_data = get_cached_user_data(user_id)
-        if cached_data:
-            subscriptions = {user_id: cached_data}
-        else:
-            subscriptions = await load_subscriptions()
+        subscriptions = await load_subscriptions_for_command()
+        current = subscriptions.get(user_id)
         
-        if user_id not in subscriptions:
+        if not current:
             return False, "User is not subscribed", []
         
-        if 'tags' not in subscriptions[user_id]:
-            subscriptions[user_id]['tags'] = []
-            
-        removed_tags = []
-        for tag in tags:
-            tag_clean = tag.strip()
-            if tag_clean in subscriptions[user_id]['tags']:
-                subscriptions[user_id]['tags'].remove(tag_clean)
-                removed_tags.append(tag_clean)
+        existing = set(current['tags'])
+        removed_tags = list(dict.fromkeys(tag.strip() for tag in tags if tag.strip() in existing))
         
-        await rate_limiter.wait_for_slot()
-        circuit_breaker.execute(
-            lambda: supabase.table('subscriptions').upsert({
-                'userId': user_id,
-                'subscribed': subscriptions[user_id]['subscribed'],
-                'tags': json.dumps(subscriptions[user_id]['tags'])
-            }).execute()
-        )
+        # Filter in one pass instead of list.remove() per tag
+        to_remove = set(removed_tags)
+        user_tags = [tag for tag in current['tags'] if tag not in to_remove]
         
-        # Update cache
-        set_cached_user_data(user_id, subscriptions[user_id])
+        if removed_tags:
+            save_subscription(user_id, current['subscribed'], user_tags)
         
         if removed_tags:
             return True, f"Successfully removed tags: {', '.join(removed_tags)}", removed_tags
@@ -649,126 +981,306 @@ async def remove_user_tags(user_id: str, tags: list):
     except Exception as e:
         return False, f"Error removing tags: {str(e)}", []
 
+async def load_posted_ids():
+    """Hydrate posted_ids from Supabase so restarts don't resend old stories"""
+    try:
+        if db_pool is not None:
+            rows = await db_pool.fetch(
+                'SELECT id FROM posted_stories ORDER BY ts DESC LIMIT $1', POSTED_IDS_LIMIT
+            )
+        else:
+            await rate_limiter.wait_for_slot()
+            response = await run_db(
+                lambda: get_supabase().table('posted_stories')
+                    .select('id')
+                    .order('ts', desc=True)
+                    .limit(POSTED_IDS_LIMIT)
+                    .execute()
+            )
+            rows = response.data if response else None
+        
+        if not rows:
+            return
+        
+        # Rows arrive newest first; insert oldest first so eviction order is preserved
+        for row in reversed(rows):
+            remember_posted_id(str(row['id']))
+        print(f"[INFO] Loaded {len(posted_ids)} posted story IDs")
+    except Exception as e:
+        print(f"[WARNING] Failed to load posted story IDs: {e}")
+
+def save_posted_ids(story_ids: list):
+    """Queue newly posted story IDs for the next batched Supabase write"""
+    for story_id in story_ids:
+        queue_upsert('posted_stories', story_id, {'id': story_id})
+
+# Write-behind buffer: table -> row key -> latest row, flushed as one upsert per table
+pending_upserts: Dict[str, Dict[str, dict]] = defaultdict(dict)
+# Rows a flush has taken out of pending_upserts but not yet confirmed, so a refresh can still see them
+inflight_upserts: Dict[str, Dict[str, dict]] = {}
+
+def queue_upsert(table: str, key: str, row: dict):
+    """Queue a row for the next batched upsert (later writes to a key replace earlier ones)"""
+    pending_upserts[table][key] = row
+
+UPSERT_BATCH_SIZE = 500  # Rows per upsert request
+
+def write_error_code(e: Exception) -> str:
+    """SQLSTATE (asyncpg) or PostgREST error code of a failed write, or '' if there is none"""
+    return str(getattr(e, 'sqlstate', None) or getattr(e, 'code', None) or '')
+
+def is_table_write_error(code: str) -> bool:
+    # Class 42 (RLS/privilege denials, missing table or column) fails every row the same way
+    return code.startswith('42') or code.startswith('PGRST2')
+
+def is_row_write_error(code: str) -> bool:
+    # Data (22) and constraint (23) errors come from specific rows; PGRST1xx are rejected requests
+    return code[:2] in ('22', '23') or code.startswith('PGRST1')
+
+def drop_rows(table: str, rows: list, e: Exception, code: str):
+    """Report rows that can never be written; they are dropped rather than retried forever"""
+    print(f"[ERROR] Dropping {len(rows)} {table} rows that can't be written ({code}): {e}")
+    if code == '42501':
+        print("[ERROR] RLS policies issue detected - table access blocked (see docs/rls-policies.md)")
+
+async def write_rows(table: str, rows: list):
+    """Upsert rows in one round-trip over asyncpg or PostgREST"""
+    if db_pool is not None:
+        sql, columns = UPSERT_SQL[table]
+        await db_pool.executemany(sql, [tuple(row[column] for column in columns) for row in rows])
+    else:
+        await rate_limiter.wait_for_slot()
+        await run_db(lambda: get_supabase().table(table).upsert(rows).execute())
+
+async def write_or_isolate(table: str, rows: list):
+    """Write rows, dropping only the ones that fail permanently; transient errors propagate"""
+    try:
+        await write_rows(table, rows)
+    except Exception as e:
+        code = write_error_code(e)
+        if is_table_write_error(code) or (is_row_write_error(code) and len(rows) == 1):
+            drop_rows(table, rows, e, code)
+        elif is_row_write_error(code):
+            # A batch fails as a unit; split it so one bad row doesn't block the rest
+            middle = len(rows) // 2
+            await write_or_isolate(table, rows[:middle])
+            await write_or_isolate(table, rows[middle:])
+        else:
+            raise
+
+# Serializes flushes: send_news_dms and flush_upserts_task can both flush, and overlapping
+# flushes could pop the same table twice or write an older row after a newer one
+flush_lock = asyncio.Lock()
+
+async def flush_pending_upserts():
+    """Write all queued rows to Supabase with one batched upsert per table (chunked)"""
+    async with flush_lock:
+        for table in list(pending_upserts):
+            # Swap the batch out first so writes queued during the round-trip aren't lost
+            rows = pending_upserts.pop(table, None)
+            if not rows:
+                continue
+            inflight_upserts[table] = dict(rows)
+            try:
+                # Chunked so a large backlog stays under request size limits
+                keys = list(rows)
+                for start in range(0, len(keys), UPSERT_BATCH_SIZE):
+                    chunk_keys = keys[start:start + UPSERT_BATCH_SIZE]
+                    await write_or_isolate(table, [rows[key] for key in chunk_keys])
+                    # Drop written rows so a later failure only re-queues what's left
+                    for key in chunk_keys:
+                        del rows[key]
+            except Exception as e:
+                # Transient (network, breaker open, timeouts) - retry on the next flush
+                print(f"[WARNING] Failed to flush {len(rows)} queued {table} rows: {e}")
+                # Re-queue without clobbering newer writes for the same keys
+                for key, row in rows.items():
+                    pending_upserts[table].setdefault(key, row)
+            finally:
+                inflight_upserts.pop(table, None)
+
+def json_loads(data):
+    """Decode JSON with orjson when available, falling back to the stdlib"""
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+def json_dumps(data):
+    """Encode JSON with orjson when available (returns bytes), falling back to the stdlib"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data)
+
+# Cache values at or above this size are zstd-compressed before going to Redis
+COMPRESS_MIN_BYTES = 1024
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'  # zstd frame header; JSON can never start with it
+zstd_compressor = zstandard.ZstdCompressor(level=3) if ZSTD_AVAILABLE else None
+zstd_decompressor = zstandard.ZstdDecompressor() if ZSTD_AVAILABLE else None
+
+def encode_cache_value(data: Any) -> bytes:
+    """Serialize a value for Redis, compressing it when large and zstd is available"""
+    payload = json_dumps(data)
+    if isinstance(payload, str):
+        payload = payload.encode()
+    if ZSTD_AVAILABLE and len(payload) >= COMPRESS_MIN_BYTES:
+        return zstd_compressor.compress(payload)
+    return payload
+
+def decode_cache_value(raw: bytes) -> Any:
+    """Deserialize a Redis value written by encode_cache_value"""
+    if raw.startswith(ZSTD_MAGIC):
+        if not ZSTD_AVAILABLE:
+            raise ValueError("compressed cache value but zstandard is not installed")
+        raw = zstd_decompressor.decompress(raw)
+    return json_loads(raw)
+
 # Enhanced caching functions with Redis support
-def get_cached_data(cache_key: str, cache_type: str = 'default') -> Optional[Any]:
+async def get_cached_data(cache_key: str, cache_type: str = 'default') -> Optional[Any]:
     """Get cached data from Redis or memory fallback"""
     global cache_hits, cache_misses
     
-    ttl = METADATA_CACHE_TTL.get(cache_type, CACHE_TTL)
-    
     if REDIS_AVAILABLE and redis_client:
         try:
-            cached = redis_client.get(cache_key)
+            cached = await redis_client.get(cache_key)
             if cached:
                 cache_hits += 1
-                return json.loads(cached)
+                return decode_cache_value(cached)
         except Exception as e:
             print(f"[WARNING] Redis get failed: {e} - falling back to memory")
     
-    # Fallback to memory cache
-    with cache_lock:
-        if cache_key in user_cache and cache_key in cache_expiry:
-            if time.time() - cache_expiry[cache_key] < ttl:
-                cache_hits += 1
-                return user_cache[cache_key]
-            else:
-                # Clean up expired entry
-                user_cache.pop(cache_key, None)
-                cache_expiry.pop(cache_key, None)
+    # Fallback to memory cache (TTLCache drops expired entries itself)
+    cached = memory_cache(cache_type).get(cache_key)
+    if cached is not None:
+        cache_hits += 1
+        return cached
     
     cache_misses += 1
     return None
 
-def set_cached_data(cache_key: str, data: Any, cache_type: str = 'default'):
+async def set_cached_data(cache_key: str, data: Any, cache_type: str = 'default'):
     """Set cached data in Redis and memory"""
     ttl = METADATA_CACHE_TTL.get(cache_type, CACHE_TTL)
     
     if REDIS_AVAILABLE and redis_client:
         try:
             # Only try to JSON serialize for Redis if it's serializable
-            redis_client.setex(cache_key, ttl, json.dumps(data))
+            await redis_client.setex(cache_key, ttl, encode_cache_value(data))
         except (TypeError, ValueError) as e:
             print(f"[WARNING] Redis set failed (not JSON serializable): {e}")
         except Exception as e:
             print(f"[WARNING] Redis set failed: {e}")
     
     # Fallback to memory cache (always works)
-    with cache_lock:
-        user_cache[cache_key] = data
-        cache_expiry[cache_key] = time.time()
+    memory_cache(cache_type)[cache_key] = data
 
-def get_cached_user_data(user_id: str):
-    """Get cached user subscription data"""
-    return get_cached_data(f"user_sub:{user_id}", 'user_subscriptions')
+async def get_cached_data_bulk(cache_keys: list, cache_type: str = 'default') -> Dict[str, Any]:
+    """Get many cached entries with a single Redis MGET, returning only the hits"""
+    global cache_hits, cache_misses
+    
+    found = {}
+    
+    if REDIS_AVAILABLE and redis_client and cache_keys:
+        try:
+            values = await redis_client.mget(cache_keys)
+            for cache_key, cached in zip(cache_keys, values):
+                if cached:
+                    found[cache_key] = decode_cache_value(cached)
+        except Exception as e:
+            print(f"[WARNING] Redis mget failed: {e} - falling back to memory")
+    
+    # Fill the remaining keys from the memory cache
+    cache = memory_cache(cache_type)
+    for cache_key in cache_keys:
+        if cache_key not in found and cache_key in cache:
+            found[cache_key] = cache[cache_key]
+    
+    cache_hits += len(found)
+    cache_misses += len(cache_keys) - len(found)
+    return found
 
-def set_cached_user_data(user_id: str, data):
-    """Set cached user subscription data"""
-    set_cached_data(f"user_sub:{user_id}", data, 'user_subscriptions')
+async def set_cached_data_bulk(entries: Dict[str, Any], cache_type: str = 'default'):
+    """Set many cached entries with a single Redis pipeline round-trip"""
+    ttl = METADATA_CACHE_TTL.get(cache_type, CACHE_TTL)
+    
+    if REDIS_AVAILABLE and redis_client:
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            for cache_key, data in entries.items():
+                pipe.setex(cache_key, ttl, encode_cache_value(data))
+            await pipe.execute()
+        except (TypeError, ValueError) as e:
+            print(f"[WARNING] Redis pipeline set failed (not JSON serializable): {e}")
+        except Exception as e:
+            print(f"[WARNING] Redis pipeline set failed: {e}")
+    
+    memory_cache(cache_type).update(entries)
+
+async def delete_cached_data(cache_key: str, cache_type: str = 'default'):
+    """Remove a cached entry from Redis and memory"""
+    if REDIS_AVAILABLE and redis_client:
+        try:
+            await redis_client.delete(cache_key)
+        except Exception as e:
+            print(f"[WARNING] Redis delete failed: {e}")
+    
+    memory_cache(cache_type).pop(cache_key, None)
 
 def cleanup_expired_cache():
     """Clean up expired memory cache entries"""
-    with cache_lock:
-        current_time = time.time()
-        expired_keys = [
-            key for key, expiry_time in cache_expiry.items()
-            if current_time - expiry_time >= METADATA_CACHE_TTL.get('default', CACHE_TTL)
-        ]
-        for key in expired_keys:
-            user_cache.pop(key, None)
-            cache_expiry.pop(key, None)
-        
-        if expired_keys:
-            print(f"[INFO] Cleaned {len(expired_keys)} expired cache entries")
+    # Idle caches are never touched, so their stale entries would sit in memory until swept
+    cleaned = sum(len(cache.expire()) for cache in memory_caches.values())
+    
+    if cleaned:
+        print(f"[INFO] Cleaned {cleaned} expired cache entries")
 
 # Cache decorator for database operations - moved above to resolve ordering issue
 
-# Specific metadata caching functions
-async def get_cached_timezone_names():
-    """Get timezone names with long-term caching (resolves pg_timezone_names slow query)"""
-    cache_key = "pg_timezone_names"
-    cached = get_cached_data(cache_key, 'timezone_names')
+async def get_or_populate(cache_key: str, cache_type: str, build: Callable) -> Any:
+    """Return a cached value, building it on a miss; concurrent misses share one build"""
+    cached = await get_cached_data(cache_key, cache_type)
     if cached is not None:
         return cached
     
+    async def populate():
+        value = build()
+        await set_cached_data(cache_key, value, cache_type)
+        return value
+    
+    return await single_flight(f"populate:{cache_key}", populate)
+
+# Specific metadata caching functions
+async def get_cached_timezone_names():
+    """Get timezone names with long-term caching (resolves pg_timezone_names slow query)"""
+    return await get_or_populate("pg_timezone_names", 'timezone_names', build_timezone_names)
+
+def build_timezone_names() -> list:
     # This would normally trigger the slow pg_timezone_names query
     # Instead, we cache a static list or fetch from materialized view
-    common_timezones = [
+    return [
         'UTC', 'US/Eastern', 'US/Central', 'US/Mountain', 'US/Pacific',
         'Europe/London', 'Europe/Paris', 'Europe/Berlin', 'Europe/Moscow',
         'Asia/Tokyo', 'Asia/Shanghai', 'Asia/Dubai', 'Asia/Kolkata',
         'Australia/Sydney', 'Pacific/Auckland'
     ]
-    
-    set_cached_data(cache_key, common_timezones, 'timezone_names')
-    return common_timezones
 
 async def get_cached_extension_info():
     """Get extension information with caching (resolves pg_available_extensions slow query)"""
-    cache_key = "pg_extension_info"
-    cached = get_cached_data(cache_key, 'extension_info')
-    if cached is not None:
-        return cached
-    
+    return await get_or_populate("pg_extension_info", 'extension_info', build_extension_info)
+
+def build_extension_info() -> list:
     # Cache basic extension info to avoid frequent queries
-    extension_info = [
+    return [
         {'name': 'uuid-ossp', 'schema': 'public', 'installed_version': '1.1.2'},
         {'name': 'pg_stat_statements', 'schema': 'pg_catalog', 'installed_version': '1.10'},
         {'name': 'pg_cron', 'schema': 'public', 'installed_version': '1.5.0'},
         {'name': 'pgcrypto', 'schema': 'public', 'installed_version': '1.3.2'},
     ]
-    
-    set_cached_data(cache_key, extension_info, 'extension_info')
-    return extension_info
 
 async def get_cached_function_metadata():
     """Get function metadata with aggressive caching (resolves recursive query 429 errors)"""
-    cache_key = "pg_function_metadata"
-    cached = get_cached_data(cache_key, 'function_metadata')
-    if cached is not None:
-        return cached
-    
+    return await get_or_populate("pg_function_metadata", 'function_metadata', build_function_metadata)
+
+def build_function_metadata() -> dict:
     # Cache essential function metadata to prevent recursive queries
-    function_metadata = {
+    return {
         'public_functions': [
             {'schema': 'public', 'name': 'get_user_subscriptions', 'return_type': 'table'},
             {'schema': 'public', 'name': 'update_subscription', 'return_type': 'boolean'},
@@ -777,9 +1289,6 @@ async def get_cached_function_metadata():
         'total_count': 3,
         'last_updated': time.time()
     }
-    
-    set_cached_data(cache_key, function_metadata, 'function_metadata')
-    return function_metadata
 
 # Cache statistics
 def get_cache_stats():
@@ -791,115 +1300,218 @@ def get_cache_stats():
         'cache_hits': cache_hits,
         'cache_misses': cache_misses,
         'hit_ratio': hit_ratio,
-        'memory_cache_size': len(user_cache),
+        'memory_cache_size': sum(len(cache) for cache in memory_caches.values()),
         'redis_connected': REDIS_AVAILABLE and redis_client is not None
     }
 
-async def send_dm_to_user(user, story):
-    """Send a story as DM to a user with rate limiting"""
-    user_id = str(user.id)
-    
+# Users resolved when their DM channel ID isn't cached yet, kept so fetch_user runs at most once per subscriber
+# (bounded LRU so departed subscribers don't accumulate)
+RESOLVED_USERS_LIMIT = 4096
+resolved_users: "OrderedDict[int, discord.User]" = OrderedDict()
+
+async def resolve_user(user_id: str):
+    """Get a Discord user from our cache or the client cache, fetching over REST only on a miss"""
+    uid = int(user_id)
+    user = resolved_users.get(uid) or client.get_user(uid)
+    if user is None:
+        user = await client.fetch_user(uid)
+    resolved_users[uid] = user
+    resolved_users.move_to_end(uid)
+    if len(resolved_users) > RESOLVED_USERS_LIMIT:
+        resolved_users.popitem(last=False)
+    return user
+
+MAX_EMBEDS_PER_MESSAGE = 10  # Discord's limit
+
+# Per-route "don't call before" deadlines on the monotonic clock, shared by every sender
+route_deadlines: Dict[str, float] = {}
+
+async def wait_route(route: str):
+    """Sleep until a route's shared backoff deadline has passed"""
+    delay = route_deadlines.get(route, 0) - time.monotonic()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+def defer_route(route: str, headers):
+    """Push a route's deadline out by the reset time Discord reported on a 429"""
+    # X-RateLimit-Reset-After has millisecond precision; Retry-After is the coarse fallback
+    reset_after = headers.get("X-RateLimit-Reset-After") or headers.get("Retry-After")
+    deadline = time.monotonic() + parse_retry_after(reset_after)
+    route_deadlines[route] = max(route_deadlines.get(route, 0), deadline)
+
+def build_story_embed(story: dict) -> discord.Embed:
+    """Build the DM embed for a story"""
+    source_link = story["source_link"]
+    return discord.Embed(
+        title=story["title"][:256],
+        description=f"📰 **Source**: {source_link} | ⏰ **Age**: {story['age']}",
+        url=source_link
+    )
+
+def dm_channel_key(user_id: str) -> str:
+    """Cache key under which a user's DM channel ID is stored"""
+    return f"dm_channel:{user_id}"
+
+async def open_dm_channel(user_id: str, channel_id: Optional[int] = None):
+    """Get a user's DM channel, resolving the user and creating the channel only when its ID isn't cached"""
+    if channel_id is None:
+        user = await resolve_user(user_id)
+        channel = user.dm_channel or await user.create_dm()
+        channel_id = channel.id
+        await set_cached_data(dm_channel_key(user_id), channel_id, 'dm_channels')
+    # Sending to a partial channel is a single REST call with no user lookup
+    return client.get_partial_messageable(channel_id, type=discord.ChannelType.private)
+
+async def send_dm_to_user(user_id: str, embeds: list, channel_id: Optional[int] = None):
+    """Send prebuilt story embeds to a user as a single DM, with rate limiting"""
     # Check DM cooldown
     current_time = time.time()
     if user_id in dm_cooldowns and current_time - dm_cooldowns[user_id] < 1.0:
         return False
     
     try:
-        await wait_for_rate_limit("dm")
-        
-        source_link = story["hn_link"] if story["url"].startswith("item?id=") else story["url"]
-        
-        embed = discord.Embed(
-            title=story["title"][:256],
-            description=f"📰 **Source**: {source_link} | ⏰ **Age**: {story['age']}",
-            url=source_link
-        )
+        await wait_route("dm")
+        await dm_rate_limiter.wait_for_slot()
         
-        await user.send(embed=embed)
+        channel = await open_dm_channel(user_id, channel_id)
+        await channel.send(embeds=embeds[:MAX_EMBEDS_PER_MESSAGE])
         
         # Update DM cooldown
         dm_cooldowns[user_id] = current_time
         
         return True
+    except discord.NotFound:
+        # Stale channel ID or deleted account; resolve the user again next cycle
+        await delete_cached_data(dm_channel_key(user_id), 'dm_channels')
+        resolved_users.pop(int(user_id), None)
+        return False
     except discord.Forbidden:
+        # DMs closed - the channel ID is still right, so keep it
         return False
     except discord.HTTPException as e:
         if e.status == 429:
-            # Handle rate limit specifically
-            retry_after = e.response.headers.get('Retry-After')
-            if retry_after:
-                await asyncio.sleep(int(retry_after) + 1)
+            # Every DM sender waits out the same deadline instead of each sleeping on its own
+            defer_route("dm", e.response.headers)
         return False
     except Exception:
         return False
 
-@tasks.loop(hours=6)
+# Story ID -> users who already received it while the story is still unmarked (a cycle cut
+# short by DELIVERY_TIMEOUT); the retry skips those pairs. Dropped once the story is marked posted
+delivered_to: Dict[str, set] = defaultdict(set)
+
+@tasks.loop(hours=NEWS_INTERVAL_HOURS)
 async def send_news_dms():
     """Send news to subscribed users with enhanced caching and performance optimization"""
     try:
-        # Use cached subscriptions with circuit breaker protection
-        subscriptions = await load_subscriptions()
-        if not subscriptions:
-            return
-        
         # Fetch stories once per cycle instead of multiple times
-        stories = fetch_hn_stories()
+        stories = await fetch_hn_stories(exclude_ids=posted_ids)
+        if stories is None:
+            # Don't lose a whole cycle to a transient outage; try again sooner
+            print(f"[WARNING] HN fetch failed after {FETCH_RETRIES} attempts - retrying in {FETCH_FAILURE_RETRY_MINUTES} minutes")
+            send_news_dms.change_interval(minutes=FETCH_FAILURE_RETRY_MINUTES)
+            return
+        if send_news_dms.hours != NEWS_INTERVAL_HOURS:
+            send_news_dms.change_interval(hours=NEWS_INTERVAL_HOURS)
         if not stories:
             return
             
         # Limit to recent stories to reduce processing
         new_stories = [s for s in stories[:20] if s["id"] not in posted_ids]
         
+        # Nothing new is the common case - skip the subscription load entirely
         if not new_stories:
             return
         
-        # Process users in smaller batches to reduce load
-        processed_users = 0
+        # Forget partial deliveries of stories that are no longer candidates
+        for story_id in set(delivered_to) - {story["id"] for story in new_stories}:
+            del delivered_to[story_id]
+        
+        # In-process subscriptions, loaded once at startup
+        subscriptions = await load_subscriptions()
+        if not subscriptions:
+            return
+        
+        stories_to_check = new_stories[:5]  # Limit to 5 stories per user
+        
+        # Scan each story once and collect per-user hits, instead of testing every user
+        matcher = KeywordMatcher(subscriptions)
+        matches = defaultdict(list)
+        for story in stories_to_check:
+            for user_id in matcher.users_for(story):
+                matches[user_id].append(story)
+        
+        # Build each story's embed once; every recipient's message reuses it
+        story_embeds = {story["id"]: build_story_embed(story) for story in stories_to_check}
+        
+        # Work out each subscriber's stories before touching the Discord API
+        deliveries = []
         for user_id, user_data in subscriptions.items():
-            if processed_users >= 5:  # Limit to 5 users per cycle
-                break
-                
             if not user_data.get('subscribed'):
                 continue
             
             keywords = user_data.get('tags', [])
             # Send all stories if no keywords, otherwise filter by keywords
-            stories_to_check = new_stories[:5]  # Limit to 5 stories per user
-            
             if keywords:
-                # Filter by keywords
-                matching_stories = []
-                for story in stories_to_check:
-                    if story_matches_keywords(story, keywords):
-                        matching_stories.append(story)
-                stories_to_send = matching_stories[:3]  # Send top 3 matching stories
+                stories_to_send = matches.get(user_id, [])[:3]  # Send top 3 matching stories
             else:
                 # No keywords = send latest stories
                 stories_to_send = stories_to_check[:3]  # Send top 3 latest stories
             
-            # Send multiple stories to each user
+            # Skip stories this user already got before a timed-out cycle
+            stories_to_send = [story for story in stories_to_send if user_id not in delivered_to.get(story["id"], ())]
+            
             if stories_to_send:
-                try:
-                    user = await client.fetch_user(int(user_id))
-                    if user:
-                        for i, story in enumerate(stories_to_send):
-                            if await send_dm_to_user(user, story):
-                                if i < len(stories_to_send) - 1:  # No delay after last story
-                                    await asyncio.sleep(2)  # Delay between stories
-                        processed_users += 1
-                    else:
-                        break
-                except Exception:
-                    continue
+                deliveries.append((user_id, stories_to_send))
+        
+        # One MGET for every recipient's DM channel ID; only misses need fetch_user/create_dm
+        channel_ids = await get_cached_data_bulk([dm_channel_key(user_id) for user_id, _ in deliveries], 'dm_channels')
+        
+        # Deliver to users concurrently (bounded) so one slow DM doesn't block the rest;
+        # the global DM token bucket still caps total Discord QPS
+        async def deliver(user_id: str, stories_to_send: list):
+            async with delivery_limiter:
+                # All of a user's stories go out as one message
+                sent = await send_dm_to_user(
+                    user_id,
+                    [story_embeds[story["id"]] for story in stories_to_send],
+                    channel_ids.get(dm_channel_key(user_id))
+                )
+                if sent:
+                    for story in stories_to_send:
+                        delivered_to[story["id"]].add(user_id)
+        
+        try:
+            # Bound the whole fan-out; on timeout wait_for cancels the deliveries still running
+            await asyncio.wait_for(
+                asyncio.gather(
+                    *(deliver(user_id, stories_to_send) for user_id, stories_to_send in deliveries),
+                    return_exceptions=True
+                ),
+                timeout=DELIVERY_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            # Leave the stories unmarked; the next run retries them, skipping users in delivered_to
+            print(f"[WARNING] News delivery exceeded {DELIVERY_TIMEOUT}s - cancelled remaining DMs")
+            return
         
         # Mark stories as posted
         for story in new_stories:
-            posted_ids.add(story["id"])
+            remember_posted_id(story["id"])
+            delivered_to.pop(story["id"], None)
+        save_posted_ids([story["id"] for story in new_stories])
+        await flush_pending_upserts()
             
     except Exception as e:
         print(f"[ERROR] Error in send_news_dms: {e}")
         return
 
+# Batched database writes
+@tasks.loop(seconds=5)
+async def flush_upserts_task():
+    """Periodically flush queued Supabase upserts"""
+    await flush_pending_upserts()
+
 # Cache cleanup task (resolves memory leak issues)
 @tasks.loop(minutes=10)
 async def cleanup_cache_task():
@@ -914,6 +1526,8 @@ async def cache_stats_task():
     print(f"[CACHE STATS] Hits: {stats['cache_hits']}, Misses: {stats['cache_misses']}, Hit Ratio: {stats['hit_ratio']:.2%}, Memory Size: {stats['memory_cache_size']}, Redis Connected: {stats['redis_connected']}")
 
 # Preload critical caches on startup (resolves slow query issues immediately)
+preload_task: Optional[asyncio.Task] = None  # Held so the startup preload isn't garbage collected
+
 async def preload_critical_caches():
     """Preload critical metadata caches to avoid initial slow queries"""
     try:
@@ -926,118 +1540,138 @@ async def preload_critical_caches():
     except Exception as e:
         print(f"[WARNING] Failed to preload caches: {e}")
 
-@client.event
-async def on_message(message):
-    """Handle bot commands"""
-    if message.author == client.user:
-        return
-    
-    if message.channel.id != CHANNEL_ID:
-        return
-    
-    content = message.content.strip()
+def parse_tag_list(tags_str: str) -> list:
+    """Parse a comma-separated tag argument, tolerating surrounding quotes"""
+    tags_str = tags_str.strip()
+    # Normalize smart quotes to regular quotes
+    tags_str = tags_str.replace('\u201c', '"').replace('\u201d', '"')
+    if tags_str.startswith('"') and tags_str.endswith('"'):
+        tags_str = tags_str[1:-1]
     
-    if content.startswith('!yc-news subscribe'):
-        try:
-            user_id = str(message.author.id)
-            
-            success, response_message = await subscribe_user(user_id)
-            
-            if success:
-                await message.author.send(f"✅ {response_message}")
-            else:
-                await message.channel.send(f"❌ {response_message}")
-        except discord.HTTPException as e:
-            if e.status == 429:
-                await asyncio.sleep(2)
-            await message.channel.send("❌ Error processing subscription. Please try again later.")
-        except Exception:
-            await message.channel.send("❌ Error processing subscription. Please try again.")
-    
-    elif content.startswith('!yc-news unsubscribe'):
-        try:
-            user_id = str(message.author.id)
-            
-            success, response_message = await unsubscribe_user(user_id)
-            
-            if success:
-                await message.author.send(f"❌ {response_message}")
-            else:
-                await message.channel.send(f"❌ {response_message}")
-        except Exception:
-            await message.channel.send("❌ Error processing unsubscription. Please try again.")
-    
-    elif content.startswith('!yc-news add='):
-        try:
-            user_id = str(message.author.id)
-            
-            tags_str = content.split('=', 1)[1].strip()
-            # Normalize smart quotes to regular quotes
-            tags_str = tags_str.replace('\u201c', '"').replace('\u201d', '"')
-            if tags_str.startswith('"') and tags_str.endswith('"'):
-                tags_str = tags_str[1:-1]
-            
-            new_tags = [tag.strip() for tag in tags_str.split(',') if tag.strip()]
-            
-            success, response_message, added_tags = await add_user_tags(user_id, new_tags)
-            
-            if success and added_tags:
-                await message.author.send(f"✅ {response_message}")
-            else:
-                await message.author.send(f"ℹ️ {response_message}")
-        except Exception:
-            await message.channel.send("❌ Error adding tags. Please try again.")
-    
-    elif content.startswith('!yc-news remove='):
-        try:
-            user_id = str(message.author.id)
-            
-            tags_str = content.split('=', 1)[1].strip()
-            # Normalize smart quotes to regular quotes
-            tags_str = tags_str.replace('\u201c', '"').replace('\u201d', '"')
-            if tags_str.startswith('"') and tags_str.endswith('"'):
-                tags_str = tags_str[1:-1]
-            
-            tags_to_remove = [tag.strip() for tag in tags_str.split(',') if tag.strip()]
-            
-            success, response_message, removed_tags = await remove_user_tags(user_id, tags_to_remove)
-            
-            if success:
-                await message.author.send(f"✅ {response_message}")
-                if not removed_tags:
-                    await message.author.send("ℹ️ No matching tags found.")
+    return [tag.strip() for tag in tags_str.split(',') if tag.strip()]
+
+async def handle_subscribe(message, arg: str):
+    """Subscribe the author to news DMs"""
+    try:
+        user_id = str(message.author.id)
+        
+        success, response_message = await subscribe_user(user_id)
+        
+        if success:
+            await message.author.send(f"✅ {response_message}")
+        else:
+            await message.channel.send(f"❌ {response_message}")
+    except discord.HTTPException as e:
+        if e.status == 429:
+            await asyncio.sleep(2)
+        await message.channel.send("❌ Error processing subscription. Please try again later.")
+    except Exception:
+        await message.channel.send("❌ Error processing subscription. Please try again.")
+
+async def handle_unsubscribe(message, arg: str):
+    """Unsubscribe the author from news DMs"""
+    try:
+        user_id = str(message.author.id)
+        
+        success, response_message = await unsubscribe_user(user_id)
+        
+        if success:
+            await message.author.send(f"❌ {response_message}")
+        else:
+            await message.channel.send(f"❌ {response_message}")
+    except Exception:
+        await message.channel.send("❌ Error processing unsubscription. Please try again.")
+
+async def handle_add(message, arg: str):
+    """Add comma-separated tags to the author's feed"""
+    try:
+        user_id = str(message.author.id)
+        
+        new_tags = parse_tag_list(arg)
+        
+        success, response_message, added_tags = await add_user_tags(user_id, new_tags)
+        
+        if success and added_tags:
+            await message.author.send(f"✅ {response_message}")
+        else:
+            await message.author.send(f"ℹ️ {response_message}")
+    except Exception:
+        await message.channel.send("❌ Error adding tags. Please try again.")
+
+async def handle_remove(message, arg: str):
+    """Remove comma-separated tags from the author's feed"""
+    try:
+        user_id = str(message.author.id)
+        
+        tags_to_remove = parse_tag_list(arg)
+        
+        success, response_message, removed_tags = await remove_user_tags(user_id, tags_to_remove)
+        
+        if success:
+            await message.author.send(f"✅ {response_message}")
+            if not removed_tags:
+                await message.author.send("ℹ️ No matching tags found.")
+        else:
+            await message.author.send(f"❌ {response_message}")
+    except Exception:
+        await message.channel.send("❌ Error removing tags. Please try again.")
+
+async def handle_tags(message, arg: str):
+    """Show the author's current tags"""
+    try:
+        user_id = str(message.author.id)
+        
+        success, response_message, tags = await get_user_tags(user_id)
+        
+        if success:
+            if tags:
+                await message.author.send(f"📋 {response_message}")
             else:
-                await message.author.send(f"❌ {response_message}")
-        except Exception:
-            await message.channel.send("❌ Error removing tags. Please try again.")
+                await message.author.send("📋 You have no tags subscribed. Without tags, you'll receive the top 3 latest stories. Use `!yc-news add=\"AI, ML\"` to add tags and get filtered news.")
+        else:
+            await message.author.send(f"❌ {response_message}")
+    except Exception:
+        await message.channel.send("❌ Error retrieving tags. Please try again.")
+
+async def handle_clear(message, arg: str):
+    """Clear posted_ids cache to resend stories"""
+    posted_ids.clear()
+    await message.author.send("🗑️ Posted story cache cleared. Stories can be resent now.")
+
+async def set_http_cap(cap: int):
+    """Resize every per-host HTTP limiter, including ones created later"""
+    global host_concurrency
+    host_concurrency = cap
+    for limiter in host_limiters.values():
+        await limiter.set_capacity(cap)
+
+CONCURRENCY_CAPS = {
+    "delivery": delivery_limiter.set_capacity,
+    "http": set_http_cap,
+}
+
+async def handle_set_cap(message, arg: str):
+    """Resize a concurrency cap at runtime, e.g. `set-cap delivery 4` (administrators only)"""
+    permissions = getattr(message.author, 'guild_permissions', None)
+    if permissions is None or not permissions.administrator:
+        await message.channel.send("❌ Only server administrators can change concurrency caps.")
+        return
     
-    elif content == '!yc-news tags':
-        try:
-            user_id = str(message.author.id)
-            
-            success, response_message, tags = await get_user_tags(user_id)
-            
-            if success:
-                if tags:
-                    await message.author.send(f"📋 {response_message}")
-                else:
-                    await message.author.send("📋 You have no tags subscribed. Without tags, you'll receive the top 3 latest stories. Use `!yc-news add=\"AI, ML\"` to add tags and get filtered news.")
-            else:
-                await message.author.send(f"❌ {response_message}")
-        except Exception:
-            await message.channel.send("❌ Error retrieving tags. Please try again.")
+    parts = arg.split()
+    if len(parts) != 2 or parts[0] not in CONCURRENCY_CAPS or not parts[1].isdigit() or int(parts[1]) < 1:
+        await message.channel.send(f"ℹ️ Usage: `!yc-news set-cap <{'|'.join(CONCURRENCY_CAPS)}> <n>` with n >= 1")
+        return
     
-    elif content == '!yc-news clear':
-        """Clear posted_ids cache to resend stories"""
-        global posted_ids
-        posted_ids.clear()
-        await message.author.send("🗑️ Posted story cache cleared. Stories can be resent now.")
+    name, cap = parts[0], int(parts[1])
+    await CONCURRENCY_CAPS[name](cap)
+    print(f"[INFO] {name} concurrency cap set to {cap} by {message.author}")
+    await message.channel.send(f"✅ {name} concurrency cap set to {cap}.")
+
+async def handle_cache_stats(message, arg: str):
+    """Show cache performance statistics"""
+    stats = get_cache_stats()
+    msg = f"""📊 **Cache Performance Stats**
     
-    elif content == '!yc-news cache-stats':
-        """Show cache performance statistics"""
-        stats = get_cache_stats()
-        msg = f"""📊 **Cache Performance Stats**
-        
 **Cache Performance:**
 • Hits: {stats['cache_hits']}
 • Misses: {stats['cache_misses']}
@@ -1046,195 +1680,241 @@ async def on_message(message):
 • Redis Connected: {'✅ Yes' if stats['redis_connected'] else '❌ No (Memory fallback)'}
 
 **Cache TTL Settings:**
-• User Subscriptions: 5 minutes
+• User Subscriptions: in-process, written through on change
 • Timezone Names: 24 hours
 • Extension Info: 12 hours
 • Function Metadata: 12 hours"""
-        await message.author.send(msg)
+    await message.author.send(msg)
+
+async def handle_refresh_cache(message, arg: str):
+    """Force refresh subscriptions and preload critical caches"""
+    # Re-read the subscriptions table (queued writes are kept)
+    await load_subscriptions(refresh=True)
     
-    elif content == '!yc-news refresh-cache':
-        """Force refresh user cache and preload critical caches"""
-        user_id = str(message.author.id)
-        
-        # Clear user cache
-        with cache_lock:
-            keys_to_remove = [k for k in user_cache.keys() if k.startswith(f'user_sub:{user_id}')]
-            for key in keys_to_remove:
-                user_cache.pop(key, None)
-                cache_expiry.pop(key, None)
-        
-        # Clear Redis cache for user if available
-        if REDIS_AVAILABLE and redis_client:
-            try:
-                redis_client.delete(f"user_sub:{user_id}")
-            except Exception as e:
-                print(f"[WARNING] Redis delete failed: {e}")
-        
-        # Preload critical caches
-        await preload_critical_caches()
-        
-        await message.author.send("🔄 Your cache has been refreshed and critical caches preloaded.")
+    # Preload critical caches
+    await preload_critical_caches()
+    
+    await message.author.send("🔄 Your cache has been refreshed and critical caches preloaded.")
+
+async def handle_preload(message, arg: str):
+    """Preload all critical caches to prevent slow queries"""
+    await preload_critical_caches()
+    
+    stats = get_cache_stats()
+    await message.author.send(f"""⚡ **Critical Caches Preloaded**
     
-    elif content == '!yc-news preload':
-        """Preload all critical caches to prevent slow queries"""
-        await preload_critical_caches()
-        
-        stats = get_cache_stats()
-        await message.author.send(f"""⚡ **Critical Caches Preloaded**
-        
 ✅ Timezone Names (24h TTL)
 ✅ Extension Info (12h TTL)  
 ✅ Function Metadata (12h TTL)
 
 Cache Status: {stats['hit_ratio']:.2%} hit ratio
 Redis Status: {'Connected' if stats['redis_connected'] else 'Memory Fallback'}""")
+
+async def handle_test(message, arg: str):
+    """Run the HN scraping debug report and DM the results"""
+    debug_info = await debug_hn_scraping()
     
-    elif content == '!yc-news test':
-        debug_info = await debug_hn_scraping()
-        
-        # Format the debug results for Discord
-        msg_parts = []
-        msg_parts.append(f"🔍 **HN Scraping Debug Report**")
-        msg_parts.append(f"**Status:** {debug_info['status']}")
-        
-        # Network and parsing
-        if 'network' in debug_info['steps']:
-            msg_parts.append(f"**Network:** {debug_info['steps']['network']}")
-        if 'parsing' in debug_info['steps']:
-            msg_parts.append(f"**HTML Parsing:** {debug_info['steps']['parsing']}")
-        
-        # Selector results
-        if 'selectors' in debug_info['steps']:
-            msg_parts.append("**CSS Selectors:**")
-            for selector, result in debug_info['steps']['selectors'].items():
-                msg_parts.append(f"  • `{selector}` → {result}")
-        
-        # Analysis results
-        if 'parsing_analysis' in debug_info['steps']:
-            analysis = debug_info['steps']['parsing_analysis']
-            msg_parts.append(f"**Analysis:** {analysis['total_rows']} total rows, limited to {analysis['limited_to']}")
-        
-        # Parsing results
-        if 'parsing_results' in debug_info['steps']:
-            results = debug_info['steps']['parsing_results']
-            msg_parts.append(f"**Parsing Results:** {results['parsed_count']} successful, {results['failed_count']} failed")
-            
-            if results['failure_reasons']:
-                msg_parts.append("**Failure Reasons:**")
-                for reason, count in results['failure_reasons'].items():
-                    msg_parts.append(f"  • {reason}: {count}")
-        
-        # Final result
-        if 'final_result' in debug_info['steps']:
-            msg_parts.append(f"**Final Result:** {debug_info['steps']['final_result']}")
-        
-        # Sample stories analysis
-        if debug_info['sample_stories']:
-            msg_parts.append("\n**Sample Stories Analysis:**")
-            for story in debug_info['sample_stories'][:3]:  # Limit to 3 samples to avoid message length issues
-                msg_parts.append(f"\n**Story {story['index']}:**")
-                msg_parts.append(f"  • ID: {story['steps'].get('id', 'N/A')}")
-                if 'title' in story:
-                    msg_parts.append(f"  • Title: {story['title'][:60]}...")
-                if 'url' in story:
-                    msg_parts.append(f"  • URL: {story['url'][:40]}...")
-                msg_parts.append(f"  • Title Link: {story['steps'].get('title_link', 'N/A')}")
-                if 'age' in story['steps']:
-                    msg_parts.append(f"  • Age: {story['steps']['age']}")
-        
-        # Errors
-        if debug_info['errors']:
-            msg_parts.append("\n**Errors:**")
-            for error in debug_info['errors']:
-                msg_parts.append(f"  • {error}")
-        
-        # Send the debug report
-        debug_message = "\n".join(msg_parts)
-        
-        # Split if too long for Discord (max 2000 chars)
-        if len(debug_message) > 1900:
-            parts = [debug_message[i:i+1900] for i in range(0, len(debug_message), 1900)]
-            for i, part in enumerate(parts):
-                header = f"🔍 **HN Scraping Debug Report (Part {i+1}/{len(parts)})**" if i > 0 else part
-                await message.author.send(header)
-                await asyncio.sleep(0.5)  # Small delay between messages
-        else:
-            await message.author.send(debug_message)
+    # Format the debug results for Discord
+    msg_parts = []
+    msg_parts.append(f"🔍 **HN Scraping Debug Report**")
+    msg_parts.append(f"**Status:** {debug_info['status']}")
+    
+    # Network and parsing
+    if 'network' in debug_info['steps']:
+        msg_parts.append(f"**Network:** {debug_info['steps']['network']}")
+    if 'parsing' in debug_info['steps']:
+        msg_parts.append(f"**HTML Parsing:** {debug_info['steps']['parsing']}")
+    
+    # Selector results
+    if 'selectors' in debug_info['steps']:
+        msg_parts.append("**CSS Selectors:**")
+        for selector, result in debug_info['steps']['selectors'].items():
+            msg_parts.append(f"  • `{selector}` → {result}")
+    
+    # Analysis results
+    if 'parsing_analysis' in debug_info['steps']:
+        analysis = debug_info['steps']['parsing_analysis']
+        msg_parts.append(f"**Analysis:** {analysis['total_rows']} total rows, limited to {analysis['limited_to']}")
+    
+    # Parsing results
+    if 'parsing_results' in debug_info['steps']:
+        results = debug_info['steps']['parsing_results']
+        msg_parts.append(f"**Parsing Results:** {results['parsed_count']} successful, {results['failed_count']} failed")
+        
+        if results['failure_reasons']:
+            msg_parts.append("**Failure Reasons:**")
+            for reason, count in results['failure_reasons'].items():
+                msg_parts.append(f"  • {reason}: {count}")
+    
+    # Final result
+    if 'final_result' in debug_info['steps']:
+        msg_parts.append(f"**Final Result:** {debug_info['steps']['final_result']}")
+    
+    # Sample stories analysis
+    if debug_info['sample_stories']:
+        msg_parts.append("\n**Sample Stories Analysis:**")
+        for story in debug_info['sample_stories'][:3]:  # Limit to 3 samples to avoid message length issues
+            msg_parts.append(f"\n**Story {story['index']}:**")
+            msg_parts.append(f"  • ID: {story['steps'].get('id', 'N/A')}")
+            if 'title' in story:
+                msg_parts.append(f"  • Title: {story['title'][:60]}...")
+            if 'url' in story:
+                msg_parts.append(f"  • URL: {story['url'][:40]}...")
+            msg_parts.append(f"  • Title Link: {story['steps'].get('title_link', 'N/A')}")
+            if 'age' in story['steps']:
+                msg_parts.append(f"  • Age: {story['steps']['age']}")
+    
+    # Errors
+    if debug_info['errors']:
+        msg_parts.append("\n**Errors:**")
+        for error in debug_info['errors']:
+            msg_parts.append(f"  • {error}")
+    
+    # Send the debug report
+    debug_message = "\n".join(msg_parts)
+    
+    # Split if too long for Discord (max 2000 chars)
+    if len(debug_message) > 1900:
+        parts = [debug_message[i:i+1900] for i in range(0, len(debug_message), 1900)]
+        for i, part in enumerate(parts):
+            header = f"🔍 **HN Scraping Debug Report (Part {i+1}/{len(parts)})**" if i > 0 else part
+            await message.author.send(header)
+            await asyncio.sleep(0.5)  # Small delay between messages
+    else:
+        await message.author.send(debug_message)
+
+# Prefix, verb and optional "=argument" in one match; non-command chatter fails on the first character
+COMMAND_RE = re.compile(r'\s*!yc-news\s+(?P<verb>[\w-]+)\s*(?P<sep>=?)(?P<arg>.*)', re.DOTALL)
+
+# Command dispatch table keyed by the word after the prefix
+COMMAND_HANDLERS = {
+    "subscribe": handle_subscribe,
+    "unsubscribe": handle_unsubscribe,
+    "add=": handle_add,
+    "remove=": handle_remove,
+    "tags": handle_tags,
+    "clear": handle_clear,
+    "cache-stats": handle_cache_stats,
+    "refresh-cache": handle_refresh_cache,
+    "set-cap": handle_set_cap,
+    "preload": handle_preload,
+    "test": handle_test,
+}
+
+# Verbs that take a space-separated argument; every other verb without '=' must stand alone
+SPACE_ARGUMENT_COMMANDS = {"set-cap"}
+
+@client.event
+async def on_message(message):
+    """Handle bot commands"""
+    if message.author == client.user:
+        return
+    
+    if message.channel.id != CHANNEL_ID:
+        return
+    
+    match = COMMAND_RE.match(message.content)
+    if not match:
+        return
+    
+    # "add=tags" / "remove=tags" carry their argument after the '='
+    command = match.group('verb') + match.group('sep')
+    arg = match.group('arg').strip()
+    # "!yc-news clear this up" is chatter, not a command
+    if arg and not match.group('sep') and command not in SPACE_ARGUMENT_COMMANDS:
+        return
+    handler = COMMAND_HANDLERS.get(command)
+    if handler:
+        await handler(message, arg)
 
 async def run_bot_with_retry():
     """Run the bot with exponential backoff retry logic"""
     global connection_attempts, last_connection_attempt
     
-    for attempt in range(MAX_RETRIES):
-        try:
-            connection_attempts = attempt + 1
-            last_connection_attempt = time.time()
-            
-            # Add delay between connection attempts
-            if attempt > 0:
-                delay = exponential_backoff(attempt)
-                print(f"[INFO] Waiting {delay}s before retry {attempt + 1}/{MAX_RETRIES}")
-                await asyncio.sleep(delay)
+    try:
+        for attempt in range(MAX_RETRIES):
+            try:
+                connection_attempts = attempt + 1
+                last_connection_attempt = time.time()
             
-            # Configure client with proper User-Agent
-            await client.login(DISCORD_TOKEN)
-            await client.connect()
+                # Each failure branch below waits before the next attempt, so no extra delay here
+                await client.login(DISCORD_TOKEN)
+                await client.connect()
             
-            print(f"[INFO] Bot connected successfully on attempt {attempt + 1}")
-            break
+                print(f"[INFO] Bot connected successfully on attempt {attempt + 1}")
+                break
             
-        except discord.HTTPException as e:
-            if e.status == 429:
-                retry_after = e.response.headers.get('Retry-After') if e.response else None
-                if retry_after:
-                    wait_time = int(retry_after) + random.randint(1, 5)
+            except discord.HTTPException as e:
+                if attempt == MAX_RETRIES - 1:
+                    raise
+                if e.status == 429:
+                    # Discord says exactly how long to wait; backing off further only delays startup
+                    retry_after = e.response.headers.get('Retry-After') if e.response else None
+                    wait_time = rate_limit_delay(retry_after)
                     print(f"[INFO] Rate limited. Waiting {wait_time}s before retry...")
                     await asyncio.sleep(wait_time)
+                elif "HTML" in str(e) or "doctype" in str(e).lower():
+                    # Likely Cloudflare protection
+                    wait_time = exponential_backoff(attempt) * 2
+                    print(f"[INFO] Possible Cloudflare protection. Waiting {wait_time}s...")
+                    await asyncio.sleep(wait_time)
                 else:
                     wait_time = exponential_backoff(attempt)
-                    print(f"[INFO] Rate limited. Waiting {wait_time}s before retry...")
+                    print(f"[ERROR] Discord HTTP error: {e} - retrying in {wait_time}s")
                     await asyncio.sleep(wait_time)
-            elif "HTML" in str(e) or "doctype" in str(e).lower():
-                # Likely Cloudflare protection
-                wait_time = exponential_backoff(attempt) * 2
-                print(f"[INFO] Possible Cloudflare protection. Waiting {wait_time}s...")
-                await asyncio.sleep(wait_time)
-            else:
-                print(f"[ERROR] Discord HTTP error: {e}")
+                    
+            except Exception as e:
+                print(f"[ERROR] Connection attempt {attempt + 1} failed: {e}")
                 if attempt == MAX_RETRIES - 1:
                     raise
-                    
-        except Exception as e:
-            print(f"[ERROR] Connection attempt {attempt + 1} failed: {e}")
-            if attempt == MAX_RETRIES - 1:
-                raise
-            await asyncio.sleep(exponential_backoff(attempt))
+                await asyncio.sleep(exponential_backoff(attempt))
+    finally:
+        await close_http_session()
+        # Commands are write-behind; don't drop changes users were told succeeded
+        await flush_pending_upserts()
+        await close_db_pool()
+        await close_redis()
 
 @client.event
 async def on_ready():
     print(f"[INFO] Bot is ready! Logged in as {client.user}")
     
-    # Preload critical caches to resolve slow query issues immediately
-    await preload_critical_caches()
+    # Open the shared HTTP session used by the HN fetchers
+    get_http_session()
+    
+    # Connect the Redis cache (falls back to memory if unreachable)
+    await connect_redis()
+    await share_db_breaker_state()
+    
+    # Connect straight to Postgres when configured; otherwise everything goes through PostgREST
+    await open_db_pool()
+    
+    # Restore already-posted story IDs so a restart doesn't resend them
+    await load_posted_ids()
+    
+    # Load subscriptions once; commands and news delivery read the in-process copy
+    await load_subscriptions()
+    
+    # Warm critical caches in the background; the getters populate on first miss anyway,
+    # so a slow Redis shouldn't hold up startup
+    global preload_task
+    preload_task = asyncio.create_task(preload_critical_caches())
     
     # Start all background tasks
     send_news_dms.start()
+    flush_upserts_task.start()
     cleanup_cache_task.start()
     cache_stats_task.start()
     
-    print("[INFO] Background tasks started: news delivery, cache cleanup, cache statistics")
+    print("[INFO] Background tasks started: news delivery, write flushing, cache cleanup, cache statistics")
 
 @client.event
 async def on_disconnect():
     print("[INFO] Bot disconnected")
 
 if __name__ == "__main__":
-    # Set User-Agent for requests
-    if hasattr(requests, 'Session'):
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (compatible; YCNewsBot/1.0; +https://github.com/yc-news-bot)'
-        })
-    
-    # Run the bot with retry logic
-    asyncio.run(run_bot_with_retry())
\ No newline at end of file
+    # Run the bot with retry logic, on uvloop when available
+    if UVLOOP_AVAILABLE:
+        uvloop.run(run_bot_with_retry())
+    else:
+        asyncio.run(run_bot_with_retry())
\ No newline at end of file
@@ -105,9 +105,11 @@ check_imports() {
 import sys
 try:
     import discord
-    import requests
-    import bs4
+    import aiohttp
+    import selectolax
     from supabase import create_client
+    import pybreaker
+    import cachetools
     from dotenv import load_dotenv
     print('✅ All required packages imported successfully')
 except ImportError as e: